@@ -1,12 +1,27 @@
 import sqlcipher3.dbapi2 as sqlite
 from getpass import getpass
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional
+from contextlib import contextmanager
+import atexit
+import csv
 import hashlib
+import hmac
+import itertools
+import os
+import re
+import sys
+import threading
 import readline
 from datetime import datetime
 
+_ROW_FMT = "{:<5} {:<30} {:<20} {:<10} {:<15} {:<15}".format
+_DT_RE = re.compile(r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$')
+
 class Book:
+    __slots__ = ('id', 'title', 'author', 'status', 'created_at', 'last_modified',
+                 'started_reading', 'finished_reading')
+
     def __init__(self, id: Optional[int] = None, title: Optional[str] = None, 
                  author: Optional[str] = None, status: str = 'unread',
                  created_at: Optional[str] = None, last_modified: Optional[str] = None,
@@ -21,7 +36,8 @@ class Book:
         self.finished_reading = finished_reading
 
     def __str__(self) -> str:
-        return f"{self.id:<5} {self.title:<30} {self.author:<20} {self.status:<10} {self.started_reading or 'Not started':<15} {self.finished_reading or 'Not finished':<15}"
+        return _ROW_FMT(self.id, self.title, self.author, self.status,
+                        self.started_reading or 'Not started', self.finished_reading or 'Not finished')
 
     def mark_as_read(self) -> None:
         self.status = 'read'
@@ -36,50 +52,229 @@ class DatabaseManager(ABC):
     def execute_query(self, query: str, params: tuple = ()) -> None:
         pass
 
+    @abstractmethod
+    def execute_many(self, query: str, seq_of_params: List[tuple]) -> None:
+        pass
+
     @abstractmethod
     def fetch_all(self, query: str, params: tuple = ()) -> List[tuple]:
         pass
 
+    @abstractmethod
+    def fetch_iter(self, query: str, params: tuple = ()) -> Iterator[tuple]:
+        pass
+
+    @abstractmethod
+    def transaction(self):
+        pass
+
+class PooledConnection:
+    """A pooled connection plus the state every DatabaseConnection sharing it must agree on."""
+
+    def __init__(self, conn, key_digest: bytes):
+        self.conn = conn
+        self.key_digest = key_digest
+        self.transaction_depth = 0
+        self.committed_changes = 0
+
+class ConnectionPool:
+    """Keeps one keyed SQLCipher connection per database file for the life of the process,
+    so the key derivation only runs once."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connections = {}
+        self._salt = os.urandom(16)
+
+    def _key_digest(self, password: str) -> bytes:
+        # Salted fingerprint, so reuse can be checked without keeping the plaintext key.
+        return hashlib.blake2b(password.encode(), key=self._salt).digest()
+
+    def get(self, db_name: str, password: str) -> PooledConnection:
+        key_digest = self._key_digest(password)
+        with self._lock:
+            entry = self._connections.get(db_name)
+            if entry is not None:
+                if not hmac.compare_digest(entry.key_digest, key_digest):
+                    raise sqlite.DatabaseError("incorrect password")
+                return entry
+            conn = sqlite.connect(db_name, check_same_thread=False)
+            try:
+                # PRAGMA arguments cannot be bound, so quote the key as an SQL string literal.
+                conn.execute("PRAGMA key = '{}'".format(password.replace("'", "''")))
+                # journal_mode reads the header, so a wrong key or corrupt file fails here.
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute("PRAGMA temp_store=MEMORY")
+                conn.execute("PRAGMA cache_size=-64000")
+            except sqlite.Error:
+                conn.close()
+                raise
+            entry = PooledConnection(conn, key_digest)
+            self._connections[db_name] = entry
+            return entry
+
+    def close_all(self) -> None:
+        with self._lock:
+            for entry in self._connections.values():
+                entry.conn.close()
+            self._connections.clear()
+
+_pool = ConnectionPool()
+atexit.register(_pool.close_all)
+
 class DatabaseConnection(DatabaseManager):
     def __init__(self, db_name: str, password: Optional[str] = None):
         self.db_name = db_name
         self.password = password or getpass("Enter database password: ")
         self.conn = None
-        self.cursor = None
-        self.initial_hash = self._calculate_db_hash()
+        self._entry = None
+        self._committed_changes = 0
         self.connect()
+        self.initial_version = self._db_version()
 
-    def _calculate_db_hash(self) -> str:
-        try:
-            with open(self.db_name, 'rb') as f:
-                return hashlib.md5(f.read()).hexdigest()
-        except FileNotFoundError:
-            return ""
+    def _db_version(self) -> tuple:
+        # data_version only moves for commits by other connections; the pooled counter covers ours.
+        return (self.conn.execute("PRAGMA data_version").fetchone()[0], self._entry.committed_changes)
+
+    def _record_commit(self, changes_before: int) -> None:
+        # Only called after a successful commit, so rolled-back rows are never counted.
+        changes = self.conn.total_changes - changes_before
+        self._entry.committed_changes += changes
+        self._committed_changes += changes
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        # The pooled connection stays open; it is closed at process exit.
         if self.conn:
-            self.conn.close()
-            final_hash = self._calculate_db_hash()
-            if final_hash != self.initial_hash:
-                print(f"Database hash changed from {self.initial_hash} to {final_hash}")
+            final_version = self._db_version()
+            if final_version != self.initial_version:
+                print(f"Database changed during this session ({self._committed_changes} rows modified here)")
+
     def connect(self) -> bool:
         try:
-            self.conn = sqlite.connect(self.db_name)
-            self.cursor = self.conn.cursor()
-            self.cursor.execute(f"PRAGMA key='{self.password}'")
+            self._entry = _pool.get(self.db_name, self.password)
+            self.conn = self._entry.conn
+            self.password = None
             return True
         except sqlite.Error as e:
-            raise Exception("Database file is corrupted or incorrect password") from None
+            raise sqlite.DatabaseError("Database file is corrupted or incorrect password") from None
     def execute_query(self, query: str, params: tuple = ()) -> None:
-        self.cursor.execute(query, params)
+        if self._entry.transaction_depth:
+            self.conn.execute(query, params)
+            return
+        changes_before = self.conn.total_changes
+        with self.conn:
+            self.conn.execute(query, params)
+        self._record_commit(changes_before)
+
+    def execute_many(self, query: str, seq_of_params: List[tuple]) -> None:
+        if self._entry.transaction_depth:
+            self.conn.executemany(query, seq_of_params)
+            return
+        changes_before = self.conn.total_changes
+        with self.conn:
+            self.conn.executemany(query, seq_of_params)
+        self._record_commit(changes_before)
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        # Nested calls join the outermost transaction.
+        if self._entry.transaction_depth:
+            self._entry.transaction_depth += 1
+            try:
+                yield
+            finally:
+                self._entry.transaction_depth -= 1
+            return
+        changes_before = self.conn.total_changes
+        self.conn.execute("BEGIN")
+        self._entry.transaction_depth = 1
+        try:
+            yield
+        except BaseException:
+            self._entry.transaction_depth = 0
+            self.conn.rollback()
+            raise
+        self._entry.transaction_depth = 0
         self.conn.commit()
+        self._record_commit(changes_before)
 
     def fetch_all(self, query: str, params: tuple = ()) -> List[tuple]:
-        self.cursor.execute(query, params)
-        return self.cursor.fetchall()
+        return self.conn.execute(query, params).fetchall()
+
+    def fetch_iter(self, query: str, params: tuple = ()) -> Iterator[tuple]:
+        # Each conn.execute() hands out its own cursor, so other queries can run mid-iteration.
+        return iter(self.conn.execute(query, params))
+
+_BOOK_COLUMNS = "id, title, author, status, created_at, last_modified, started_reading, finished_reading"
+
+_SQL_CREATE_TABLE = '''
+    CREATE TABLE IF NOT EXISTS books (
+        id INTEGER PRIMARY KEY,
+        title TEXT NOT NULL,
+        author TEXT,
+        status TEXT CHECK(status IN ('unread', 'read')) DEFAULT 'unread',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_modified TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        started_reading TIMESTAMP,
+        finished_reading TIMESTAMP
+    )
+'''
+
+_SQL_CREATE_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_books_status ON books(status) WHERE status = 'unread'",
+    "CREATE INDEX IF NOT EXISTS idx_books_title ON books(title COLLATE NOCASE)",
+)
+
+_SQL_DROP_INDEXES = (
+    "DROP INDEX IF EXISTS idx_books_status",
+    "DROP INDEX IF EXISTS idx_books_title",
+)
+
+# Loads above this many rows into a smaller table build the indexes once at the end instead.
+_BULK_INDEX_THRESHOLD = 1000
+_IMPORT_CHUNK_SIZE = 500
+
+_SQL_INSERT = '''
+    INSERT INTO books (title, author, created_at, last_modified, started_reading, finished_reading)
+    VALUES (?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, NULL, NULL)
+'''
+
+_SQL_COUNT = "SELECT COUNT(*) FROM books"
+_SQL_SELECT_ALL = f"SELECT {_BOOK_COLUMNS} FROM books"
+_SQL_SELECT_BY_STATUS = f"SELECT {_BOOK_COLUMNS} FROM books WHERE status = ?"
+_SQL_SELECT_BY_ID = f"SELECT {_BOOK_COLUMNS} FROM books WHERE id = ? LIMIT 1"
+
+# Reading dates are stored in local time, matching the dates users type in.
+_SQL_NOW_LOCAL = "datetime('now', 'localtime')"
+
+_SQL_UPDATE_READ = f'''
+    UPDATE books
+    SET status = ?, last_modified = CURRENT_TIMESTAMP,
+        finished_reading = {_SQL_NOW_LOCAL},
+        started_reading = COALESCE(started_reading, {_SQL_NOW_LOCAL})
+    WHERE id = ?
+'''
+
+_SQL_UPDATE_STATUS = '''
+    UPDATE books
+    SET status = ?, last_modified = CURRENT_TIMESTAMP
+    WHERE id = ?
+'''
+
+_SQL_UPDATE_FULL = f'''
+    UPDATE books
+    SET status = COALESCE(?, status), title = ?, author = ?,
+        last_modified = CURRENT_TIMESTAMP,
+        started_reading = COALESCE(?, started_reading, CASE WHEN ? = 'read' THEN {_SQL_NOW_LOCAL} END),
+        finished_reading = CASE WHEN ? = 'read' THEN {_SQL_NOW_LOCAL} ELSE COALESCE(?, finished_reading) END
+    WHERE id = ?
+'''
+
+_SQL_DELETE = "DELETE FROM books WHERE id = ?"
 
 class BookRepository:
     def __init__(self, db_manager: DatabaseManager):
@@ -87,103 +282,167 @@ class BookRepository:
         self._init_database()
 
     def _init_database(self) -> None:
-        self.db_manager.execute_query('''
-            CREATE TABLE IF NOT EXISTS books (
-                id INTEGER PRIMARY KEY,
-                title TEXT NOT NULL,
-                author TEXT,
-                status TEXT CHECK(status IN ('unread', 'read')) DEFAULT 'unread',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_modified TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                started_reading TIMESTAMP,
-                finished_reading TIMESTAMP
-            )
-        ''')
+        self.db_manager.execute_query(_SQL_CREATE_TABLE)
+        self.rebuild_indexes()
+
+    def drop_indexes(self) -> None:
+        for query in _SQL_DROP_INDEXES:
+            self.db_manager.execute_query(query)
+
+    def rebuild_indexes(self) -> None:
+        for query in _SQL_CREATE_INDEXES:
+            self.db_manager.execute_query(query)
+
+    def analyze(self) -> None:
+        self.db_manager.execute_query("ANALYZE")
 
     def add(self, book: Book) -> Book:
-        self.db_manager.execute_query('''
-            INSERT INTO books (title, author, created_at, last_modified, started_reading, finished_reading)
-            VALUES (?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, NULL, NULL)
-        ''', (book.title, book.author))
+        self.add_many([book])
         return book
 
-    def get_all(self, status_filter: Optional[str] = None) -> List[Book]:
-        query = "SELECT id, title, author, status, created_at, last_modified, started_reading, finished_reading FROM books"
-        params = ()
+    def add_many(self, books: List[Book]) -> List[Book]:
+        rows = [(b.title, b.author) for b in books]
+        with self.db_manager.transaction():
+            defer_indexes = self._should_defer_indexes(len(rows))
+            if defer_indexes:
+                self.drop_indexes()
+            self.db_manager.execute_many(_SQL_INSERT, rows)
+            if defer_indexes:
+                self.rebuild_indexes()
+        return books
+
+    def import_books(self, books: Iterable[Book]) -> int:
+        books = iter(books)
+        # Look ahead just far enough to know whether this is a bulk load before inserting anything.
+        head = list(itertools.islice(books, _BULK_INDEX_THRESHOLD + 1))
+        count = 0
+        with self.db_manager.transaction():
+            defer_indexes = self._should_defer_indexes(len(head))
+            if defer_indexes:
+                self.drop_indexes()
+            books = itertools.chain(head, books)
+            while True:
+                chunk = list(itertools.islice(books, _IMPORT_CHUNK_SIZE))
+                if not chunk:
+                    break
+                self.add_many(chunk)
+                count += len(chunk)
+            if defer_indexes:
+                self.rebuild_indexes()
+            if count:
+                self.analyze()
+        return count
+
+    def _should_defer_indexes(self, incoming: int) -> bool:
+        # Rebuilding from scratch only pays off when the load outweighs what is already indexed.
+        if incoming <= _BULK_INDEX_THRESHOLD:
+            return False
+        existing = self.db_manager.fetch_all(_SQL_COUNT)[0][0]
+        return existing < incoming
+
+    def get_all(self, status_filter: Optional[str] = None) -> Iterator[Book]:
         if status_filter:
-            query += " WHERE status = ?"
-            params = (status_filter,)
-        
-        rows = self.db_manager.fetch_all(query, params)
-        return [Book(*row) for row in rows]
+            rows = self.db_manager.fetch_iter(_SQL_SELECT_BY_STATUS, (status_filter,))
+        else:
+            rows = self.db_manager.fetch_iter(_SQL_SELECT_ALL)
+        for row in rows:
+            yield Book(*row)
+
+    def get_by_id(self, book_id: int) -> Optional[Book]:
+        rows = self.db_manager.fetch_all(_SQL_SELECT_BY_ID, (book_id,))
+        return Book(*rows[0]) if rows else None
 
     def update_status(self, book_id: int, status: str) -> bool:
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         if status == 'read':
-            self.db_manager.execute_query('''
-                UPDATE books
-                SET status = ?, last_modified = CURRENT_TIMESTAMP,
-                    finished_reading = ?,
-                    started_reading = COALESCE(started_reading, ?)
-                WHERE id = ?
-            ''', (status, current_time, current_time, book_id))
+            self.db_manager.execute_query(_SQL_UPDATE_READ, (status, book_id))
         else:
-            self.db_manager.execute_query('''
-                UPDATE books
-                SET status = ?, last_modified = CURRENT_TIMESTAMP
-                WHERE id = ?
-            ''', (status, book_id))
+            self.db_manager.execute_query(_SQL_UPDATE_STATUS, (status, book_id))
         return True
 
-    def update_book(self, book_id: int, title: str, author: str, started_reading: Optional[str] = None, finished_reading: Optional[str] = None) -> bool:
-        query = '''
-            UPDATE books
-            SET title = ?, author = ?, last_modified = CURRENT_TIMESTAMP
-        '''
-        params = [title, author]
-        
-        if started_reading:
-            query += ", started_reading = ?"
-            params.append(started_reading)
-        if finished_reading:
-            query += ", finished_reading = ?"
-            params.append(finished_reading)
-            
-        query += " WHERE id = ?"
-        params.append(book_id)
-        
-        self.db_manager.execute_query(query, tuple(params))
+    def update_book_full(self, book_id: int, title: str, author: str, status: Optional[str] = None,
+                         started_reading: Optional[str] = None, finished_reading: Optional[str] = None) -> bool:
+        self.db_manager.execute_query(_SQL_UPDATE_FULL, (status, title, author,
+                                                         started_reading, status,
+                                                         status, finished_reading,
+                                                         book_id))
         return True
 
     def delete(self, book_id: int) -> bool:
-        self.db_manager.execute_query('''
-            DELETE FROM books
-            WHERE id = ?
-        ''', (book_id,))
+        self.db_manager.execute_query(_SQL_DELETE, (book_id,))
         return True
 
 class BookManagerUI:
     def __init__(self, book_repository: BookRepository):
         self.book_repository = book_repository
+        self._last_books: Optional[List[Book]] = None
+        self._cmds = {
+            'add': self.add_book,
+            'import': self.import_csv,
+            'list': self._list_all,
+            'edit': self._edit_flow,
+            'read': self._read_flow,
+            'delete': self._delete_flow,
+        }
+        readline.parse_and_bind('tab: complete')
+
+    def _complete(self, text: str, state: int) -> Optional[str]:
+        matches = [c for c in (*self._cmds, 'quit', 'exit') if c.startswith(text)]
+        return matches[state] if state < len(matches) else None
 
-    def display_books(self, books: List[Book]) -> None:
-        if not books:
+    def _get_books(self) -> List[Book]:
+        # Reuse the last full listing until a write invalidates it.
+        if self._last_books is None:
+            self._last_books = list(self.book_repository.get_all())
+        return self._last_books
+
+    def _invalidate_books(self) -> None:
+        self._last_books = None
+
+    def display_books(self, books: Iterable[Book]) -> None:
+        books = iter(books)
+        first = next(books, None)
+        if first is None:
             print("No books found!")
             return
             
         print("\nYour Library:")
-        print("{:<5} {:<30} {:<20} {:<10} {:<15} {:<15}".format("ID", "Title", "Author", "Status", "Started", "Finished"))
+        print(_ROW_FMT("ID", "Title", "Author", "Status", "Started", "Finished"))
         print("-" * 100)
-        for book in books:
-            print(str(book))
+        books = itertools.chain((first,), books)
+        while True:
+            chunk = list(itertools.islice(books, 256))
+            if not chunk:
+                break
+            sys.stdout.write("\n".join(map(str, chunk)) + "\n")
+        sys.stdout.flush()
 
     def add_book(self) -> None:
         title = input("Enter book title: ")
         author = input("Enter author: ")
         book = Book(title=title, author=author)
         self.book_repository.add(book)
+        self._invalidate_books()
         print(f"Added '{title}' to your library!")
 
+    def _iter_csv_books(self, f) -> Iterator[Book]:
+        for row in csv.reader(f):
+            if not row or not row[0].strip():
+                continue
+            author = row[1].strip() if len(row) > 1 else ''
+            yield Book(title=row[0].strip(), author=author)
+
+    def import_csv(self, path: Optional[str] = None) -> None:
+        path = path or input("Enter CSV file path (title,author per line): ")
+        try:
+            with open(path, newline='', encoding='utf-8') as f:
+                count = self.book_repository.import_books(self._iter_csv_books(f))
+        except (OSError, UnicodeDecodeError, csv.Error, sqlite.Error) as e:
+            print(f"Error: {e}")
+            return
+        finally:
+            self._invalidate_books()
+        print(f"Imported {count} books into your library!")
+
     def edit_book(self) -> None:
         book_id = input("Enter book ID to edit: ")
         try:
@@ -193,17 +452,21 @@ class BookManagerUI:
             started_reading = input("Enter started reading date (YYYY-MM-DD HH:MM:SS or press Enter to skip): ")
             finished_reading = input("Enter finished reading date (YYYY-MM-DD HH:MM:SS or press Enter to skip): ")
             
-            books = self.book_repository.get_all()
-            book = next((b for b in books if b.id == int(book_id)), None)
+            if any(date and not _DT_RE.match(date) for date in (started_reading, finished_reading)):
+                print("Invalid date! Use YYYY-MM-DD HH:MM:SS.")
+                return
+            
+            book = self.book_repository.get_by_id(int(book_id))
             if book:
                 new_title = title if title else book.title
                 new_author = author if author else book.author
                 new_started = started_reading if started_reading else book.started_reading
                 new_finished = finished_reading if finished_reading else book.finished_reading
                 
-                if self.book_repository.update_book(int(book_id), new_title, new_author, new_started, new_finished):
-                    if status and status in ['read', 'unread']:
-                        self.book_repository.update_status(int(book_id), status)
+                new_status = status if status in ['read', 'unread'] else None
+                
+                if self.book_repository.update_book_full(int(book_id), new_title, new_author, new_status, new_started, new_finished):
+                    self._invalidate_books()
                     print("Book updated successfully!")
             else:
                 print("Book not found!")
@@ -214,6 +477,7 @@ class BookManagerUI:
         book_id = input("Enter book ID to mark as read: ")
         try:
             self.book_repository.update_status(int(book_id), 'read')
+            self._invalidate_books()
             print("Book marked as read!")
         except sqlite.Error as e:
             print(f"Error: {e}")
@@ -222,35 +486,45 @@ class BookManagerUI:
         book_id = input("Enter book ID to delete: ")
         try:
             if self.book_repository.delete(int(book_id)):
+                self._invalidate_books()
                 print("Book deleted successfully!")
         except sqlite.Error as e:
             print(f"Error: {e}")
 
+    def _list_all(self) -> None:
+        self.display_books(self._get_books())
+
+    def _edit_flow(self) -> None:
+        self.display_books(self._get_books())
+        self.edit_book()
+
+    def _read_flow(self) -> None:
+        self.display_books(self.book_repository.get_all('unread'))
+        self.mark_as_read()
+
+    def _delete_flow(self) -> None:
+        self.display_books(self._get_books())
+        self.delete_book()
+
+    def _unknown(self) -> None:
+        print("Invalid command. Try: add, import, list, edit, read, delete, quit")
+
     def run(self) -> None:
         print("\nBook Manager - Encrypted Local Storage")
-        print("Commands: add, list, edit, read, delete, quit")
+        print("Commands: add, import, list, edit, read, delete, quit")
         
         while True:
-            command = input("\n> ").strip().lower()
+            # Complete command names at this prompt only, not inside sub-prompts.
+            readline.set_completer(self._complete)
+            try:
+                command = sys.intern(input("\n> ").strip().lower())
+            finally:
+                readline.set_completer(None)
             
-            if command == 'add':
-                self.add_book()
-            elif command == 'list':
-                self.display_books(self.book_repository.get_all())
-            elif command == 'edit':
-                self.display_books(self.book_repository.get_all())
-                self.edit_book()
-            elif command == 'read':
-                self.display_books(self.book_repository.get_all('unread'))
-                self.mark_as_read()
-            elif command == 'delete':
-                self.display_books(self.book_repository.get_all())
-                self.delete_book()
-            elif command in ('quit', 'exit'):
+            if command in ('quit', 'exit'):
                 print("Goodbye!")
                 break
-            else:
-                print("Invalid command. Try: add, list, edit, read, delete, quit")
+            (self._cmds.get(command) or self._unknown)()
 
 if __name__ == "__main__":
     try: